@@ -9,16 +9,21 @@ Uses Pyrogram (MTProto API) with API ID and API Hash.
 """
 
 import asyncio
+import atexit
 import json
 import logging
 import os
+import queue
 import re
 import sqlite3
 import sys
+import threading
 import time
+from collections import OrderedDict
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
-from typing import Optional
+from typing import BinaryIO, Optional, Union
 
 # Fix asyncio event loop for Python 3.14+ compatibility with Pyrogram
 # Python 3.14+ requires explicit event loop policy setup
@@ -43,25 +48,26 @@ except RuntimeError:
     asyncio.set_event_loop(loop)
 
 # Fix encoding for Windows console
-if sys.platform == 'win32':
-    try:
-        import codecs
-        # Check if stdout has encoding attribute and buffer
-        if hasattr(sys.stdout, 'buffer') and hasattr(sys.stdout, 'encoding'):
-            if sys.stdout.encoding and sys.stdout.encoding.lower() != 'utf-8':
-                sys.stdout = codecs.getwriter('utf-8')(sys.stdout.buffer, 'strict')
-        if hasattr(sys.stderr, 'buffer') and hasattr(sys.stderr, 'encoding'):
-            if sys.stderr.encoding and sys.stderr.encoding.lower() != 'utf-8':
-                sys.stderr = codecs.getwriter('utf-8')(sys.stderr.buffer, 'strict')
-    except (AttributeError, LookupError, ValueError):
-        # If codecs not available or already UTF-8, continue
-        pass
+# Skipped in UTF-8 mode (PYTHONUTF8=1 / -X utf8), where the streams are already
+# UTF-8, or when BRADAR_SKIP_STDIO_FIX=1 is set in the environment (read before .env is loaded)
+if (sys.platform == 'win32' and not sys.flags.utf8_mode
+        and os.environ.get('BRADAR_SKIP_STDIO_FIX') != '1'):
+    for _stream in (sys.stdout, sys.stderr):
+        try:
+            # Reconfigure the existing text stream in place instead of
+            # stacking a Python-level codecs writer on top of it
+            if _stream.encoding and _stream.encoding.lower() != 'utf-8':
+                _stream.reconfigure(encoding='utf-8')
+        except (AttributeError, LookupError, ValueError):
+            # Stream replaced or doesn't support reconfigure, leave it as is
+            pass
 
 from dotenv import load_dotenv
-from pyrogram import Client, filters
+from pyrogram import Client, filters, idle
 from pyrogram.errors import (
     FloodWait, 
     RPCError,
+    MessageNotModified,
     ChatWriteForbidden,
     ChannelPrivate,
     UsernameNotOccupied,
@@ -70,6 +76,12 @@ from pyrogram.errors import (
 )
 from pyrogram.types import Message
 
+# orjson is optional - it serializes the post backups faster than json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Load environment variables
 load_dotenv()
 
@@ -80,9 +92,50 @@ SESSION_NAME = os.getenv("SESSION_NAME", "bot_session")
 SOURCE_CHANNEL = os.getenv("SOURCE_CHANNEL")
 TARGET_CHANNEL = os.getenv("TARGET_CHANNEL")
 SAVE_POSTS = os.getenv("SAVE_POSTS", "true").lower() == "true"
-POSTS_FILE = os.getenv("POSTS_FILE", "saved_posts.json")
+POSTS_FILE = os.getenv("POSTS_FILE", "saved_posts.jsonl")
 MAX_RETRIES = int(os.getenv("MAX_RETRIES", "3"))
 RETRY_DELAY = int(os.getenv("RETRY_DELAY", "5"))
+BATCH_ENABLED = os.getenv("BATCH_ENABLED", "false").lower() == "true"
+BATCH_FLUSH_INTERVAL = float(os.getenv("BATCH_FLUSH_INTERVAL", "0.5"))
+MAX_BUFFER_SIZE = int(os.getenv("MAX_BUFFER_SIZE", "10"))
+BATCH_SEPARATOR = os.getenv("BATCH_SEPARATOR", "\\n\\n").replace("\\n", "\n")
+
+# Telegram limit for the text of a single message
+MAX_MESSAGE_LENGTH = 4096
+
+# Longest pause between checks in wait_for_session_unlock
+SESSION_UNLOCK_MAX_DELAY = 3.2
+
+# Seconds main() waits on shutdown for queued posts to be sent
+SHUTDOWN_SEND_TIMEOUT = 10
+
+# Cached connection used to probe the session file for locks, see
+# _get_session_probe_conn; main() closes it after each round of lock checks,
+# so it is never open while Pyrogram uses the session file
+_session_probe_conn: Optional[sqlite3.Connection] = None
+_session_probe_path: Optional[Path] = None
+
+# Backup file handle, opened on the first save_post_to_file call
+_posts_fh: Optional[BinaryIO] = None
+# Parsed contents of a legacy .json backup file, loaded on first save.
+# Saves run in a worker thread, so this is guarded by a threading lock
+_posts_cache: Optional[list] = None
+_posts_lock = threading.Lock()
+
+# Queue of posts waiting to be written by backup_writer, created in main()
+_backup_queue: Optional[asyncio.Queue] = None
+
+# Messages waiting to be re-sent after a connection error, created in main()
+_retry_queue: Optional[asyncio.Queue] = None
+
+# Outgoing message queue, created in main(). A single sender task drains it,
+# so posts reach the target channel in the order they were posted
+_send_queue: Optional[asyncio.Queue] = None
+
+# Source message id -> (target message id, sent text) for recently forwarded
+# posts, so edits update the forwarded message instead of sending a new one
+SENT_MESSAGES_CACHE_SIZE = 1000
+_sent_messages: "OrderedDict[int, tuple[int, str]]" = OrderedDict()
 
 # Validate configuration
 if not API_ID:
@@ -108,25 +161,40 @@ def normalize_channel(channel: str):
     # If it starts with @, keep it as is
     if channel.startswith('@'):
         return channel
-    # If it's a numeric string, try to convert to int (channel ID)
-    try:
+    # If it's a numeric string, convert to int (channel ID, usually negative)
+    digits = channel[1:] if channel.startswith('-') else channel
+    if digits.isdecimal():
         return int(channel)
-    except ValueError:
-        # If not numeric, assume it's a username and add @ if missing
-        return f"@{channel}" if not channel.startswith('@') else channel
+    # If not numeric, assume it's a username and add @
+    return f"@{channel}"
 
 SOURCE_CHANNEL = normalize_channel(SOURCE_CHANNEL)
 TARGET_CHANNEL = normalize_channel(TARGET_CHANNEL)
 
+# Numeric id of TARGET_CHANNEL, resolved once in main(). Sending to the id is
+# a local peer lookup, while a username is periodically re-resolved over the network
+_target_chat_id: Union[int, str] = TARGET_CHANNEL
+# Numeric id of SOURCE_CHANNEL, resolved once in main() and matched by
+# source_channel_filter with a plain integer comparison
+_source_chat_id: Optional[int] = None
+
 # Logging setup
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler('bot.log', encoding='utf-8')
-    ]
-)
+# Log calls only enqueue the record; a listener thread does the blocking
+# console/file writes so they don't stall the event loop
+_log_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+_log_handlers = [
+    logging.StreamHandler(sys.stdout),
+    logging.FileHandler('bot.log', encoding='utf-8')
+]
+for _handler in _log_handlers:
+    _handler.setFormatter(_log_formatter)
+_log_queue = queue.SimpleQueue()
+_log_listener = QueueListener(_log_queue, *_log_handlers, respect_handler_level=True)
+_log_listener.start()
+# Flush queued log records on every exit path
+atexit.register(_log_listener.stop)
+logging.root.setLevel(logging.INFO)
+logging.root.addHandler(QueueHandler(_log_queue))
 logger = logging.getLogger(__name__)
 
 # Reduce Pyrogram connection logging noise
@@ -134,60 +202,158 @@ logging.getLogger("pyrogram.connection.connection").setLevel(logging.WARNING)
 logging.getLogger("pyrogram.connection.transport").setLevel(logging.WARNING)
 logging.getLogger("pyrogram.session.session").setLevel(logging.WARNING)
 
+# Matches integers and floats (supports optional minus sign)
+# Matches: 123, 123.45, -123, -123.45, 0.5, etc.
+# A decimal point is only part of the number when digits follow it, so a
+# trailing dot (e.g. end of a sentence: "7260.") is left in the text
+_NUMBER_RE = re.compile(r'-?\d+(?:\.\d+)?')
+# Cheap pre-check: a single-digit search is much faster than the full
+# number pattern on texts that contain no digits at all
+_DIGIT_RE = re.compile(r'\d')
 
-def extract_and_process_number(text: str) -> Optional[tuple[str, str]]:
+# Extracted numbers are divided by DIVISOR; multiply by the precomputed
+# reciprocal instead of dividing on every message
+DIVISOR = 3.63
+_INV_DIVISOR = 1.0 / DIVISOR
+
+
+def process_text(text: str) -> Optional[tuple[str, str, str]]:
     """
-    Extract the first number from text, divide by 3.63, round to 2 decimals.
+    Replace the first number in text with itself divided by 3.63 (2 decimals).
+    
+    The number is found with a single regex search and replaced via its span.
     
     Args:
         text: The message text to process
         
     Returns:
-        tuple: (original_number_str, processed_number_str) or None if no number found
+        tuple: (modified_text, original_number_str, processed_number_str)
+        or None if no number found
     """
-    # Regex pattern: matches integers and floats (supports optional minus sign)
-    # Matches: 123, 123.45, -123, -123.45, 0.5, etc.
-    pattern = r'-?\d+\.?\d*'
-    match = re.search(pattern, text)
-    
-    if not match:
+    digit = _DIGIT_RE.search(text)
+    if not digit:
         logger.debug("No number found in text")
         return None
     
+    # The number starts at the first digit or at a minus sign right before it,
+    # so there's no need to scan the prefix again
+    match = _NUMBER_RE.search(text, max(digit.start() - 1, 0))
+    
     original_number_str = match.group()
-    try:
-        number = float(original_number_str)
-        processed_number = round(number / 3.63, 2)
-        processed_number_str = f"{processed_number:.2f}"
+    # _NUMBER_RE only matches the float() grammar, so this cannot raise
+    number = float(original_number_str)
+    # The .2f format rounds correctly on its own, a separate round() is redundant
+    processed_number_str = f"{number * _INV_DIVISOR:.2f}"
+    
+    if processed_number_str == original_number_str:
+        # Dividing didn't change the number (e.g. "0.00"), forward the text as is
+        return (text, original_number_str, processed_number_str)
+    
+    # Splice the new number in using the match span - the text is only scanned once
+    start, end = match.span()
+    modified_text = f"{text[:start]}{processed_number_str}{text[end:]}"
+    return (modified_text, original_number_str, processed_number_str)
+
+
+def warm_up_processing(iterations: int = 20) -> None:
+    """
+    Run process_text on sample posts so the first real post doesn't pay
+    for the interpreter warming up the hot path.
+    
+    Args:
+        iterations: Number of times to run each sample
+    """
+    samples = ("قیمت امروز 7260 تومان است", "-12.5 test", "no number here")
+    for _ in range(iterations):
+        for sample in samples:
+            process_text(sample)
+
+
+def enable_session_wal(session_name: str) -> bool:
+    """
+    Switch the session database to WAL journal mode.
+    
+    In WAL mode readers don't block the writer, and there is no rollback
+    journal left behind to cause stale locks. The mode is stored in the
+    database file, so this only does real work the first time.
+    
+    Args:
+        session_name: Name of the session file (without .session extension)
         
-        logger.info(
-            f"Number extracted: {original_number_str} → "
-            f"Processed: {processed_number_str} (÷ 3.63)"
-        )
-        return (original_number_str, processed_number_str)
+    Returns:
+        bool: True if the session database is in WAL mode, False otherwise
+    """
+    session_file = Path(f"{session_name}.session")
     
-    except ValueError as e:
-        logger.error(f"Error processing number '{original_number_str}': {e}")
-        return None
+    if not session_file.exists():
+        # Pyrogram creates it on first login; it's switched on the next start
+        return False
+    
+    try:
+        conn = sqlite3.connect(str(session_file), timeout=1.0)
+        try:
+            mode = conn.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+        finally:
+            conn.close()
+        if mode.lower() != "wal":
+            logger.debug("Session database journal mode is %s, WAL not available", mode)
+            return False
+        return True
+    except sqlite3.Error as e:
+        logger.warning("Could not enable WAL mode for session file: %s", e)
+        return False
+
+
+def _get_session_probe_conn(session_file: Path) -> sqlite3.Connection:
+    """Return the cached lock-probe connection for session_file, opening it on first use."""
+    global _session_probe_conn, _session_probe_path
+    
+    if _session_probe_conn is not None and _session_probe_path != session_file:
+        close_session_probe_conn()
+    if _session_probe_conn is None:
+        # Autocommit mode, so BEGIN/ROLLBACK below are fully under our control
+        _session_probe_conn = sqlite3.connect(str(session_file), timeout=0, isolation_level=None)
+        _session_probe_path = session_file
+    return _session_probe_conn
+
+
+def close_session_probe_conn() -> None:
+    """Close the cached lock-probe connection, if open."""
+    global _session_probe_conn, _session_probe_path
+    
+    if _session_probe_conn is not None:
+        try:
+            _session_probe_conn.close()
+        except sqlite3.Error:
+            pass
+    _session_probe_conn = None
+    _session_probe_path = None
 
 
-def replace_first_number(text: str, original: str, replacement: str) -> str:
+def _try_exclusive(conn: sqlite3.Connection, busy_timeout: float = 0) -> bool:
     """
-    Replace ONLY the first occurrence of the original number with the replacement.
+    Try to take (and immediately release) an exclusive lock on the database.
     
     Args:
-        text: Original message text
-        original: Original number string to find
-        replacement: Replacement number string
+        conn: Connection from _get_session_probe_conn
+        busy_timeout: Seconds to wait for another connection's lock to clear
+            (default 0: report a held lock immediately)
     
     Returns:
-        Modified text with only the first number replaced
+        bool: True if the lock was available, False if the database is locked
+    
+    Raises:
+        sqlite3.OperationalError: For database errors other than a lock
     """
-    # Escape special regex characters in the original number
-    escaped_original = re.escape(original)
-    # Use count=1 to replace only the first occurrence
-    modified_text = re.sub(escaped_original, replacement, text, count=1)
-    return modified_text
+    conn.execute(f"PRAGMA busy_timeout={int(busy_timeout * 1000)}")
+    try:
+        conn.execute("BEGIN EXCLUSIVE")
+    except sqlite3.OperationalError as e:
+        if "database is locked" in str(e).lower():
+            return False
+        raise
+    conn.execute("ROLLBACK")
+    return True
 
 
 def check_session_lock(session_name: str) -> tuple[bool, str]:
@@ -201,20 +367,13 @@ def check_session_lock(session_name: str) -> tuple[bool, str]:
         tuple: (is_locked, error_message)
     """
     session_file = Path(f"{session_name}.session")
-    session_journal = Path(f"{session_name}.session-journal")
     
     if not session_file.exists():
         return False, ""
     
-    # Try to open the database in exclusive mode to check if it's locked
+    # Try to lock the database in exclusive mode to check if it's locked
     try:
-        conn = sqlite3.connect(str(session_file), timeout=1.0)
-        conn.execute("BEGIN EXCLUSIVE")
-        conn.rollback()
-        conn.close()
-        return False, ""
-    except sqlite3.OperationalError as e:
-        if "database is locked" in str(e).lower():
+        if not _try_exclusive(_get_session_probe_conn(session_file)):
             error_msg = (
                 f"Session file '{session_file}' is locked. This usually means:\n"
                 f"  1. Another instance of the bot is already running\n"
@@ -223,21 +382,26 @@ def check_session_lock(session_name: str) -> tuple[bool, str]:
                 f"Solutions:\n"
                 f"  - Check if another bot instance is running and stop it\n"
                 f"  - Wait a few seconds and try again\n"
-                f"  - If the problem persists, delete '{session_file}' and '{session_journal}' "
-                f"(you'll need to re-authenticate)\n"
+                f"  - If the problem persists, delete '{session_file}' together with any "
+                f"'-journal', '-wal' and '-shm' files next to it (you'll need to re-authenticate)\n"
             )
             return True, error_msg
-        else:
-            return False, str(e)
+        return False, ""
     except Exception as e:
+        close_session_probe_conn()
         return False, str(e)
 
 
 def force_unlock_session(session_name: str) -> bool:
     """
-    Attempt to force unlock a stale session file by removing the journal file.
+    Attempt to force unlock a stale session file by removing a leftover rollback journal.
     This should only be used when you're certain no other instance is running.
     
+    Once the session is in WAL mode (see enable_session_wal) there is no
+    rollback journal. The -wal file may hold committed data that hasn't been
+    copied into the database yet, so it and the -shm index are never removed;
+    SQLite recovers them itself when the database is opened.
+    
     Args:
         session_name: Name of the session file (without .session extension)
         
@@ -253,106 +417,485 @@ def force_unlock_session(session_name: str) -> bool:
     try:
         # Remove journal file if it exists (this often resolves stale locks)
         if session_journal.exists():
-            logger.warning(f"Removing stale journal file: {session_journal}")
+            logger.warning("Removing stale journal file: %s", session_journal)
             try:
                 session_journal.unlink()
             except Exception as e:
-                logger.warning(f"Could not remove journal file: {e}")
+                logger.warning("Could not remove journal file: %s", e)
         
         # Try multiple times to ensure the database is accessible
         max_attempts = 3
         for attempt in range(max_attempts):
             try:
-                conn = sqlite3.connect(str(session_file), timeout=2.0)
+                conn = _get_session_probe_conn(session_file)
                 # Try to execute a simple query to ensure the database is accessible
                 conn.execute("SELECT 1")
                 # Try to get an exclusive lock to ensure no other process is using it
-                conn.execute("BEGIN EXCLUSIVE")
-                conn.rollback()
-                conn.close()
-                if attempt > 0:
-                    logger.info(f"Session file unlocked successfully after {attempt + 1} attempts")
-                else:
-                    logger.info("Session file unlocked successfully")
-                return True
-            except sqlite3.OperationalError as e:
-                if "database is locked" in str(e).lower():
-                    if attempt < max_attempts - 1:
-                        time.sleep(1)  # Wait a bit before retrying
-                        continue
+                if _try_exclusive(conn, busy_timeout=2.0):
+                    if attempt > 0:
+                        logger.info("Session file unlocked successfully after %s attempts", attempt + 1)
                     else:
-                        logger.warning("Session file is still locked after multiple attempts. Another process may be using it.")
-                        return False
+                        logger.info("Session file unlocked successfully")
+                    return True
+                if attempt < max_attempts - 1:
+                    time.sleep(1)  # Wait a bit before retrying
+                    continue
                 else:
-                    logger.warning(f"Database error during unlock attempt: {e}")
+                    logger.warning("Session file is still locked after multiple attempts. Another process may be using it.")
                     return False
+            except sqlite3.OperationalError as e:
+                close_session_probe_conn()
+                logger.warning("Database error during unlock attempt: %s", e)
+                return False
             except Exception as e:
+                close_session_probe_conn()
                 if attempt < max_attempts - 1:
                     time.sleep(1)
                     continue
                 else:
-                    logger.warning(f"Error during unlock attempt: {e}")
+                    logger.warning("Error during unlock attempt: %s", e)
                     return False
         return False
     except Exception as e:
-        logger.error(f"Error attempting to force unlock session: {e}")
+        logger.error("Error attempting to force unlock session: %s", e)
         return False
 
 
-async def wait_for_session_unlock(session_name: str, max_wait: int = 30, check_interval: float = 2.0) -> bool:
+async def wait_for_session_unlock(session_name: str, max_wait: float = 30) -> bool:
     """
     Wait for the session file to become unlocked.
     
+    Checks with exponential backoff (0.1s, 0.2s, 0.4s, ... capped at
+    SESSION_UNLOCK_MAX_DELAY), so a short-lived lock is noticed quickly.
+    Each check is a synchronous sqlite probe with no busy timeout: it returns
+    at once instead of blocking the event loop, so the backoff sets the pace.
+    
     Args:
         session_name: Name of the session file
         max_wait: Maximum time to wait in seconds
-        check_interval: Time between checks in seconds
         
     Returns:
         bool: True if unlocked, False if still locked after max_wait
     """
-    start_time = time.time()
-    while time.time() - start_time < max_wait:
+    deadline = time.monotonic() + max_wait
+    delay = 0.1
+    while True:
         is_locked, _ = check_session_lock(session_name)
         if not is_locked:
             return True
-        await asyncio.sleep(check_interval)
-    return False
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        await asyncio.sleep(min(delay, remaining))
+        delay = min(delay * 2, SESSION_UNLOCK_MAX_DELAY)
+
+
+def encode_post_line(message_data: dict) -> bytes:
+    """Serialize post data as one UTF-8 JSON line."""
+    if orjson is not None:
+        return orjson.dumps(message_data, option=orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(message_data, ensure_ascii=False) + '\n').encode('utf-8')
+
+
+def _save_post_to_json_array(posts_file: Path, message_data: dict) -> None:
+    """
+    Add post data to a legacy JSON array backup file.
+    
+    The array is parsed only once and kept in memory; each save rewrites the
+    file to a temporary path and atomically renames it over the original.
+    
+    Args:
+        posts_file: Path of the .json backup file
+        message_data: Dictionary containing message information
+    """
+    global _posts_cache
+    
+    with _posts_lock:
+        if _posts_cache is None:
+            # Load existing posts once
+            try:
+                with open(posts_file, 'r', encoding='utf-8') as f:
+                    _posts_cache = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError, IOError):
+                _posts_cache = []
+        
+        _posts_cache.append(message_data)
+        
+        tmp_file = posts_file.with_name(posts_file.name + '.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(_posts_cache, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, posts_file)
 
 
 def save_post_to_file(message_data: dict) -> None:
     """
-    Save post data to a JSON file for backup.
+    Append post data to the backup file.
+    
+    Files ending in .json keep the original JSON array format; any other
+    name (default saved_posts.jsonl) gets JSON Lines, one object per line.
     
     Args:
         message_data: Dictionary containing message information
     """
+    global _posts_fh
+    
     if not SAVE_POSTS:
         return
     
     try:
         posts_file = Path(POSTS_FILE)
+        if posts_file.suffix.lower() == '.json':
+            _save_post_to_json_array(posts_file, message_data)
+            logger.debug("Post saved to %s", POSTS_FILE)
+            return
         
-        # Load existing posts if file exists
-        if posts_file.exists():
-            try:
-                with open(posts_file, 'r', encoding='utf-8') as f:
-                    posts = json.load(f)
-            except (json.JSONDecodeError, IOError):
-                posts = []
-        else:
-            posts = []
+        # Open once in unbuffered binary append mode and keep it open;
+        # each post is written as a single complete line
+        if _posts_fh is None:
+            _posts_fh = open(POSTS_FILE, 'ab', buffering=0)
         
-        # Add new post
-        posts.append(message_data)
+        _posts_fh.write(encode_post_line(message_data))
         
-        # Save back to file
-        with open(posts_file, 'w', encoding='utf-8') as f:
-            json.dump(posts, f, ensure_ascii=False, indent=2)
-        
-        logger.debug(f"Post saved to {POSTS_FILE}")
+        logger.debug("Post saved to %s", POSTS_FILE)
     except Exception as e:
-        logger.error(f"Error saving post to file: {e}", exc_info=True)
+        logger.error("Error saving post to file: %s", e, exc_info=True)
+
+
+def queue_post_save(message_data: dict) -> None:
+    """
+    Hand post data to the backup writer task so the caller never does disk I/O.
+    
+    Falls back to writing directly when the writer isn't running.
+    
+    Args:
+        message_data: Dictionary containing message information
+    """
+    if not SAVE_POSTS:
+        return
+    if _backup_queue is None:
+        save_post_to_file(message_data)
+        return
+    # Copy so later updates to the record don't change what gets written
+    _backup_queue.put_nowait(dict(message_data))
+
+
+async def backup_writer(queue: asyncio.Queue) -> None:
+    """
+    Write queued post data to the backup file in a worker thread.
+    
+    Args:
+        queue: Queue of post dictionaries filled by queue_post_save;
+            None tells the writer to finish after saving what's queued
+    """
+    while True:
+        posts = [await queue.get()]
+        while not queue.empty():
+            posts.append(queue.get_nowait())
+        
+        stop = None in posts
+        posts = [message_data for message_data in posts if message_data is not None]
+        if posts:
+            await asyncio.to_thread(_save_posts, posts)
+        if stop:
+            return
+
+
+def _save_posts(posts: list[dict]) -> None:
+    """Save several posts in order."""
+    for message_data in posts:
+        save_post_to_file(message_data)
+
+
+def _record_send_error(posts: list[dict], error: Exception, error_type: str) -> None:
+    """Store a send error on each post record and save it."""
+    for message_data in posts:
+        message_data["error"] = str(error)
+        message_data["error_type"] = error_type
+        queue_post_save(message_data)
+
+
+def _record_unsent(posts: list[dict]) -> None:
+    """Record that posts were dropped because the bot stopped before sending them."""
+    _record_send_error(posts, ConnectionError("Bot stopped before the message was sent"), "Shutdown")
+
+
+def remember_sent_message(source_message_id: int, target_message_id: int, text: str) -> None:
+    """Remember which target message a source post was forwarded as (bounded LRU)."""
+    _sent_messages[source_message_id] = (target_message_id, text)
+    _sent_messages.move_to_end(source_message_id)
+    if len(_sent_messages) > SENT_MESSAGES_CACHE_SIZE:
+        _sent_messages.popitem(last=False)
+
+
+def schedule_send_retry(
+    text: str,
+    posts: list[dict],
+    source_message_id: Optional[int],
+    attempt: int,
+    error: Exception
+) -> None:
+    """
+    Hand a message that failed with a connection error to the retry sender.
+    
+    Gives up and records the error once MAX_RETRIES attempts were made, or
+    when the retry sender isn't running.
+    
+    Args:
+        text: The message text to send
+        posts: Post records covered by this message
+        source_message_id: ID of the source post
+        attempt: The attempt that just failed (1-based)
+        error: The connection error
+    """
+    if _retry_queue is None or attempt >= MAX_RETRIES:
+        logger.error("Failed to send message after %s attempts: %s", attempt, error)
+        _record_send_error(posts, error, "ConnectionError")
+        return
+    logger.warning("Connection error (attempt %s/%s): %s. Retrying in %ss...", attempt, MAX_RETRIES, error, RETRY_DELAY)
+    retry_at = time.monotonic() + RETRY_DELAY
+    _retry_queue.put_nowait((retry_at, text, posts, source_message_id, attempt + 1))
+
+
+async def retry_sender(client: Client, queue: asyncio.Queue) -> None:
+    """
+    Retry messages that failed with connection errors once the client is connected.
+    
+    Args:
+        client: The Pyrogram client instance
+        queue: Queue of (retry_at, text, posts, source_message_id, attempt)
+            filled by schedule_send_retry
+    """
+    while True:
+        retry_at, text, posts, source_message_id, attempt = await queue.get()
+        try:
+            # Wait RETRY_DELAY after the failure (messages queued together retry together)
+            delay = retry_at - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            # Pyrogram reconnects on its own (or main() restarts the client)
+            while not client.is_connected:
+                await asyncio.sleep(RETRY_DELAY)
+            await send_to_target(client, text, posts, source_message_id, attempt)
+        except asyncio.CancelledError:
+            _record_unsent(posts)
+            raise
+        except Exception as e:
+            logger.error("Unexpected error in retry_sender: %s", e, exc_info=True)
+            _record_send_error(posts, e, type(e).__name__)
+
+
+async def send_to_target(
+    client: Client,
+    text: str,
+    posts: list[dict],
+    source_message_id: Optional[int] = None,
+    attempt: int = 1
+) -> None:
+    """
+    Send text to TARGET_CHANNEL and record the outcome.
+    
+    If source_message_id was already forwarded, the earlier target message is
+    edited instead of sending a new one. Connection errors don't block the
+    caller: the message is handed to retry_sender instead.
+    
+    Args:
+        client: The Pyrogram client instance
+        text: The message text to send
+        posts: Post records covered by this message; each one is marked
+            processed (or given the error) and saved
+        source_message_id: ID of the source post, used to map edits to the
+            forwarded message (None for batched messages)
+        attempt: Attempt number, counted towards MAX_RETRIES
+    """
+    if not client.is_connected:
+        schedule_send_retry(text, posts, source_message_id, attempt, ConnectionError("Client not connected"))
+        return
+    
+    cached = _sent_messages.get(source_message_id) if source_message_id is not None else None
+    if cached is not None and cached[1] == text:
+        # Edit didn't change the forwarded text (e.g. only formatting was changed).
+        # Checked here rather than in the handler: the original post may still
+        # have been queued when the edit arrived
+        logger.info("Forwarded text unchanged after edit, skipping")
+        for message_data in posts:
+            message_data["reason"] = "Forwarded text unchanged"
+            queue_post_save(message_data)
+        return
+    
+    flood_waits = 0
+    while True:
+        try:
+            if cached is not None:
+                # Source post was edited - update the message we forwarded earlier
+                sent = await client.edit_message_text(
+                    chat_id=_target_chat_id,
+                    message_id=cached[0],
+                    text=text
+                )
+                logger.info("Message edited successfully in channel %s", TARGET_CHANNEL)
+            else:
+                # Send modified message to target channel
+                sent = await client.send_message(
+                    chat_id=_target_chat_id,
+                    text=text
+                )
+                logger.info("Message sent successfully to channel %s", TARGET_CHANNEL)
+            
+            if source_message_id is not None:
+                remember_sent_message(source_message_id, sent.id, text)
+            
+            for message_data in posts:
+                message_data["processed"] = True
+                queue_post_save(message_data)
+            return
+            
+        except (ChatWriteForbidden, ChannelPrivate, UsernameNotOccupied, PeerIdInvalid, UserBannedInChannel) as e:
+            # These errors should not be retried - they indicate permission/access issues
+            logger.error("Cannot send message to target channel %s: %s", TARGET_CHANNEL, e)
+            _record_send_error(posts, e, type(e).__name__)
+            return
+            
+        except FloodWait as e:
+            flood_waits += 1
+            if flood_waits >= MAX_RETRIES:
+                logger.error("Still rate limited after %s flood waits: %s", flood_waits, e)
+                _record_send_error(posts, e, type(e).__name__)
+                return
+            logger.warning("Flood wait: %s seconds. Waiting...", e.value)
+            # Small margin so the retry doesn't land right on the limit boundary
+            await asyncio.sleep(e.value + 0.5)
+            
+        except (ConnectionError, asyncio.TimeoutError, OSError) as e:
+            schedule_send_retry(text, posts, source_message_id, attempt, e)
+            return
+                
+        except MessageNotModified:
+            # The forwarded message already shows this text
+            logger.info("Forwarded message already up to date in channel %s", TARGET_CHANNEL)
+            remember_sent_message(source_message_id, cached[0], text)
+            for message_data in posts:
+                message_data["processed"] = True
+                queue_post_save(message_data)
+            return
+                
+        except RPCError as e:
+            if cached is not None:
+                # The forwarded message can't be edited (e.g. MessageIdInvalid after
+                # it was deleted) - forget it and send the edited post as a new message
+                logger.warning("Could not edit forwarded message %s: %s. Sending it as a new message", cached[0], e)
+                _sent_messages.pop(source_message_id, None)
+                cached = None
+                continue
+            # Other RPC errors - log and don't retry
+            logger.error("Telegram RPC error while sending to %s: %s", TARGET_CHANNEL, e, exc_info=True)
+            _record_send_error(posts, e, type(e).__name__)
+            return
+
+
+async def ordered_sender(client: Client, queue: asyncio.Queue) -> None:
+    """
+    Send queued posts one at a time, in the order they were posted.
+    
+    handle_channel_post only queues the post, so the dispatcher isn't held up
+    by the network round-trip, while an edit is always sent after the post it
+    edits and so updates the forwarded message instead of sending a new one.
+    
+    Args:
+        client: The Pyrogram client instance
+        queue: Queue of (text, message_data) pairs filled by handle_channel_post
+    """
+    while True:
+        text, message_data = await queue.get()
+        try:
+            await send_to_target(client, text, [message_data], message_data["message_id"])
+        except asyncio.CancelledError:
+            _record_unsent([message_data])
+            raise
+        except Exception as e:
+            logger.error("Unexpected error in ordered_sender: %s", e, exc_info=True)
+            _record_send_error([message_data], e, type(e).__name__)
+        finally:
+            queue.task_done()
+
+
+def pack_batch(batch: list[tuple[str, dict]]) -> list[tuple[str, list[dict]]]:
+    """
+    Join queued messages into as few Telegram messages as possible.
+    
+    Args:
+        batch: Queued (text, message_data) pairs in arrival order
+        
+    Returns:
+        list: (joined_text, posts) pairs, each text within MAX_MESSAGE_LENGTH
+    """
+    packed = []
+    texts, posts, length = [], [], 0
+    for text, message_data in batch:
+        extra = len(text) + (len(BATCH_SEPARATOR) if texts else 0)
+        if texts and length + extra > MAX_MESSAGE_LENGTH:
+            packed.append((BATCH_SEPARATOR.join(texts), posts))
+            texts, posts, length = [], [], 0
+            extra = len(text)
+        texts.append(text)
+        posts.append(message_data)
+        length += extra
+    if texts:
+        packed.append((BATCH_SEPARATOR.join(texts), posts))
+    return packed
+
+
+async def batch_sender(client: Client, queue: asyncio.Queue) -> None:
+    """
+    Collect queued messages for BATCH_FLUSH_INTERVAL seconds and send them combined.
+    
+    Args:
+        client: The Pyrogram client instance
+        queue: Queue of (text, message_data) pairs filled by handle_channel_post
+    """
+    while True:
+        batch = [await queue.get()]
+        sent = 0
+        try:
+            # Give the rest of a burst time to arrive
+            await asyncio.sleep(BATCH_FLUSH_INTERVAL)
+            while len(batch) < MAX_BUFFER_SIZE and not queue.empty():
+                batch.append(queue.get_nowait())
+            
+            logger.info("Flushing batch of %s message(s)", len(batch))
+            for text, posts in pack_batch(batch):
+                try:
+                    await send_to_target(client, text, posts)
+                except Exception as e:
+                    logger.error("Unexpected error in batch_sender: %s", e, exc_info=True)
+                    _record_send_error(posts, e, type(e).__name__)
+                sent += len(posts)
+        except asyncio.CancelledError:
+            _record_unsent([message_data for _, message_data in batch[sent:]])
+            raise
+        finally:
+            for _ in batch:
+                queue.task_done()
+
+
+_source_chat_fallback = filters.chat(SOURCE_CHANNEL)
+
+
+async def _is_source_chat(_, client: Client, message: Message) -> bool:
+    """
+    Filter callback matching updates from SOURCE_CHANNEL.
+    
+    Compares chat ids once the source channel has been resolved; until then
+    (updates can arrive right after start) falls back to filters.chat.
+    """
+    chat = message.chat
+    if chat is None:
+        return False
+    if _source_chat_id is not None:
+        return chat.id == _source_chat_id
+    return await _source_chat_fallback(client, message)
+
+
+source_channel_filter = filters.create(_is_source_chat, "SourceChannelFilter")
 
 
 async def handle_channel_post(client: Client, message: Message) -> None:
@@ -365,137 +908,93 @@ async def handle_channel_post(client: Client, message: Message) -> None:
     """
     message_data = None
     try:
-        # Only process text messages
-        if not message.text:
+        text = message.text
+        # Only process text messages (also enforced by the handler filters)
+        if not text:
             logger.debug("Received message without text, skipping")
             return
         
-        logger.info(f"New post received from channel {message.chat.id}")
-        logger.debug(f"Original text: {message.text}")
+        chat_id = message.chat.id
+        msg_id = message.id
+        logger.info("New post received from channel %s", chat_id)
+        logger.debug("Original text: %s", text)
+        
+        # Extract the first number and replace it in a single pass
+        result = process_text(text)
+        
+        if result is None and not SAVE_POSTS:
+            # Nothing to send or back up
+            logger.info("No number found in post, ignoring")
+            return
         
         # Save original post to file
         message_data = {
             "timestamp": datetime.now().isoformat(),
-            "message_id": message.id,
-            "chat_id": message.chat.id,
-            "original_text": message.text,
+            "message_id": msg_id,
+            "chat_id": chat_id,
+            "original_text": text,
             "processed": False
         }
         
-        # Extract and process the first number
-        result = extract_and_process_number(message.text)
-        
         if result is None:
             logger.info("No number found in post, ignoring")
             message_data["reason"] = "No number found"
-            save_post_to_file(message_data)
+            queue_post_save(message_data)
             return
         
-        original_number, processed_number = result
+        modified_text, original_number, processed_number = result
         
-        # Replace only the first number in the text
-        modified_text = replace_first_number(
-            message.text,
-            original_number,
-            processed_number
+        logger.info(
+            "Number extracted: %s → Processed: %s (÷ %s)",
+            original_number, processed_number, DIVISOR
         )
+        logger.info("Modified text: %s", modified_text)
         
-        logger.info(f"Modified text: {modified_text}")
+        message_data["modified_text"] = modified_text
+        message_data["original_number"] = original_number
+        message_data["processed_number"] = processed_number
         
-        # Try to send with retry logic
-        retries = 0
-        while retries < MAX_RETRIES:
-            try:
-                # Check if client is connected
-                if not client.is_connected:
-                    logger.warning("Client not connected, waiting for reconnection...")
-                    await asyncio.sleep(RETRY_DELAY)
-                    retries += 1
-                    continue
-                
-                # Send modified message to target channel
-                await client.send_message(
-                    chat_id=TARGET_CHANNEL,
-                    text=modified_text
-                )
-                
-                logger.info(f"Message sent successfully to channel {TARGET_CHANNEL}")
-                
-                # Update message data
-                message_data["processed"] = True
-                message_data["modified_text"] = modified_text
-                message_data["original_number"] = original_number
-                message_data["processed_number"] = processed_number
-                save_post_to_file(message_data)
-                return
-                
-            except (ChatWriteForbidden, ChannelPrivate, UsernameNotOccupied, PeerIdInvalid, UserBannedInChannel) as e:
-                # These errors should not be retried - they indicate permission/access issues
-                error_msg = f"Cannot send message to target channel {TARGET_CHANNEL}: {e}"
-                logger.error(error_msg)
-                if message_data:
-                    message_data["error"] = str(e)
-                    message_data["error_type"] = type(e).__name__
-                    save_post_to_file(message_data)
-                # Don't retry for permission errors
-                return
-                
-            except (ConnectionError, asyncio.TimeoutError, OSError) as e:
-                retries += 1
-                if retries < MAX_RETRIES:
-                    logger.warning(f"Connection error (attempt {retries}/{MAX_RETRIES}): {e}. Retrying in {RETRY_DELAY}s...")
-                    await asyncio.sleep(RETRY_DELAY)
-                else:
-                    logger.error(f"Failed to send message after {MAX_RETRIES} attempts: {e}")
-                    if message_data:
-                        message_data["error"] = str(e)
-                        message_data["error_type"] = "ConnectionError"
-                        save_post_to_file(message_data)
-                    raise
-                    
-            except RPCError as e:
-                # Other RPC errors - log and don't retry
-                error_msg = f"Telegram RPC error while sending to {TARGET_CHANNEL}: {e}"
-                logger.error(error_msg, exc_info=True)
-                if message_data:
-                    message_data["error"] = str(e)
-                    message_data["error_type"] = type(e).__name__
-                    save_post_to_file(message_data)
-                # Don't retry for RPC errors (except FloodWait which is handled separately)
-                return
+        if _send_queue is None:
+            await send_to_target(client, modified_text, [message_data], msg_id)
+            return
+        
+        # The sender task delivers and saves the post, so the next update can
+        # be dispatched meanwhile
+        _send_queue.put_nowait((modified_text, message_data))
+        logger.debug("Message queued for sending")
     
-    except FloodWait as e:
-        logger.warning(f"Flood wait: {e.value} seconds. Waiting...")
-        await asyncio.sleep(e.value)
-        # Retry after flood wait
-        await handle_channel_post(client, message)
     except (ConnectionError, asyncio.TimeoutError, OSError) as e:
-        logger.error(f"Connection error in handle_channel_post: {e}")
+        logger.error("Connection error in handle_channel_post: %s", e)
         if message_data:
             message_data["error"] = str(e)
-            save_post_to_file(message_data)
+            queue_post_save(message_data)
     except RPCError as e:
-        logger.error(f"Telegram RPC error: {e}", exc_info=True)
+        logger.error("Telegram RPC error: %s", e, exc_info=True)
         if message_data:
             message_data["error"] = str(e)
-            save_post_to_file(message_data)
+            queue_post_save(message_data)
     except Exception as e:
-        logger.error(f"Unexpected error in handle_channel_post: {e}", exc_info=True)
+        logger.error("Unexpected error in handle_channel_post: %s", e, exc_info=True)
         if message_data:
             message_data["error"] = str(e)
-            save_post_to_file(message_data)
+            queue_post_save(message_data)
 
 
 async def main() -> None:
     """
     Start the client and begin listening for channel posts.
     """
+    global _backup_queue, _retry_queue, _send_queue, _target_chat_id, _source_chat_id
+    
     logger.info("Starting Telegram client...")
-    logger.info(f"Source Channel: {SOURCE_CHANNEL}")
-    logger.info(f"Target Channel: {TARGET_CHANNEL}")
-    logger.info(f"Save posts to file: {SAVE_POSTS}")
+    logger.info("Source Channel: %s", SOURCE_CHANNEL)
+    logger.info("Target Channel: %s", TARGET_CHANNEL)
+    logger.info("Save posts to file: %s", SAVE_POSTS)
     if SAVE_POSTS:
-        logger.info(f"Posts file: {POSTS_FILE}")
+        logger.info("Posts file: %s", POSTS_FILE)
+    logger.info("Batch sending: %s", BATCH_ENABLED)
+    if BATCH_ENABLED:
+        logger.info("Batch flush interval: %ss, max buffer size: %s", BATCH_FLUSH_INTERVAL, MAX_BUFFER_SIZE)
     
     # Create Pyrogram client with improved configuration
     # Note: Connection retries are handled at the application level in the retry loop below
@@ -515,43 +1014,48 @@ async def main() -> None:
     max_connection_retries = 10  # Increased retries for network issues
     base_retry_delay = 15  # Start with 15 seconds delay
     
-    # Register handler for channel posts
+    # Register one handler for new and edited channel posts
     # Remove filters.channel to catch all messages from the channel
-    @app.on_message(filters.chat(SOURCE_CHANNEL))
+    # filters.text drops media/service updates before a handler task is scheduled
+    source_filter = source_channel_filter & filters.text
+    
+    @app.on_message(source_filter)
+    @app.on_edited_message(source_filter)
     async def channel_post_handler(client: Client, message: Message):
-        """Handle new channel posts."""
-        logger.info(f"Message received from chat: {message.chat.id} ({message.chat.title or message.chat.username or 'N/A'})")
-        logger.info(f"Expected source channel: {SOURCE_CHANNEL}")
+        """Handle new and edited channel posts."""
+        kind = "Edited message" if message.edit_date else "Message"
+        logger.info("%s received from chat: %s (%s)", kind, message.chat.id, message.chat.title or message.chat.username or 'N/A')
+        logger.info("Expected source channel: %s", SOURCE_CHANNEL)
         await handle_channel_post(client, message)
     
-    # Register handler for edited channel posts
-    @app.on_edited_message(filters.chat(SOURCE_CHANNEL))
-    async def edited_channel_post_handler(client: Client, message: Message):
-        """Handle edited channel posts."""
-        logger.info(f"Edited message received from chat: {message.chat.id} ({message.chat.title or message.chat.username or 'N/A'})")
-        logger.info(f"Expected source channel: {SOURCE_CHANNEL}")
-        await handle_channel_post(client, message)
+    # Check for session lock before starting. The probe connection is only
+    # needed for these checks; it must not stay open on Pyrogram's session file
+    try:
+        is_locked, lock_message = check_session_lock(SESSION_NAME)
+        if is_locked:
+            logger.warning("Session file is locked. Attempting to wait for unlock...")
+            logger.warning(lock_message)
+            unlocked = await wait_for_session_unlock(SESSION_NAME, max_wait=10)
+            if not unlocked:
+                logger.warning("Session file is still locked after waiting. Attempting to force unlock stale lock...")
+                logger.warning("Note: This is safe if no other bot instance is running.")
+                force_unlocked = force_unlock_session(SESSION_NAME)
+                if not force_unlocked:
+                    logger.error("Session file is still locked. Please resolve the issue manually:")
+                    logger.error(lock_message)
+                    logger.error("\nTo manually fix:")
+                    logger.error("  1. Make sure no other bot instance is running")
+                    logger.error("  2. Delete '%s.session' and any '-journal', '-wal' and '-shm' files next to it", SESSION_NAME)
+                    logger.error("  3. Restart the bot (you'll need to re-authenticate)")
+                    return
+                else:
+                    logger.info("Stale lock removed successfully. Proceeding with connection...")
+    finally:
+        close_session_probe_conn()
     
-    # Check for session lock before starting
-    is_locked, lock_message = check_session_lock(SESSION_NAME)
-    if is_locked:
-        logger.warning("Session file is locked. Attempting to wait for unlock...")
-        logger.warning(lock_message)
-        unlocked = await wait_for_session_unlock(SESSION_NAME, max_wait=10)
-        if not unlocked:
-            logger.warning("Session file is still locked after waiting. Attempting to force unlock stale lock...")
-            logger.warning("Note: This is safe if no other bot instance is running.")
-            force_unlocked = force_unlock_session(SESSION_NAME)
-            if not force_unlocked:
-                logger.error("Session file is still locked. Please resolve the issue manually:")
-                logger.error(lock_message)
-                logger.error("\nTo manually fix:")
-                logger.error(f"  1. Make sure no other bot instance is running")
-                logger.error(f"  2. Delete '{SESSION_NAME}.session' and '{SESSION_NAME}.session-journal'")
-                logger.error(f"  3. Restart the bot (you'll need to re-authenticate)")
-                return
-            else:
-                logger.info("Stale lock removed successfully. Proceeding with connection...")
+    if enable_session_wal(SESSION_NAME):
+        logger.info("Session database is in WAL mode")
+    warm_up_processing()
     
     # Start the client with retry logic
     logger.info("Attempting to connect to Telegram...")
@@ -564,6 +1068,23 @@ async def main() -> None:
     lock_retry_count = 0
     max_lock_retries = 3  # Prevent infinite lock retry loops
     
+    # Start the backup writer so handlers never block on disk I/O
+    writer_task = None
+    if SAVE_POSTS:
+        _backup_queue = asyncio.Queue()
+        writer_task = asyncio.create_task(backup_writer(_backup_queue))
+    
+    # Start the retry sender; it re-sends messages after connection errors
+    _retry_queue = asyncio.Queue()
+    retry_task = asyncio.create_task(retry_sender(app, _retry_queue))
+    
+    # Start the sender that delivers queued posts in order
+    _send_queue = asyncio.Queue()
+    if BATCH_ENABLED:
+        sender_task = asyncio.create_task(batch_sender(app, _send_queue))
+    else:
+        sender_task = asyncio.create_task(ordered_sender(app, _send_queue))
+    
     while connection_retries < max_connection_retries:
         try:
             # Ensure client is stopped before starting (in case of retry)
@@ -581,7 +1102,7 @@ async def main() -> None:
             
             # Get info about the logged-in user
             me = await app.get_me()
-            logger.info(f"Logged in as: {me.first_name} (@{me.username or 'N/A'})")
+            logger.info("Logged in as: %s (@%s)", me.first_name, me.username or 'N/A')
             
             # Verify access to channels
             try:
@@ -590,35 +1111,42 @@ async def main() -> None:
                 # Check source channel
                 try:
                     source_chat = await app.get_chat(SOURCE_CHANNEL)
-                    logger.info(f"✓ Source channel accessible: {source_chat.title} (@{source_chat.username or 'N/A'}) - ID: {source_chat.id}")
+                    logger.info("✓ Source channel accessible: %s (@%s) - ID: %s", source_chat.title, source_chat.username or 'N/A', source_chat.id)
+                    _source_chat_id = source_chat.id
                 except Exception as e:
-                    logger.error(f"✗ Cannot access source channel {SOURCE_CHANNEL}: {e}")
+                    logger.error("✗ Cannot access source channel %s: %s", SOURCE_CHANNEL, e)
                     logger.error("Make sure you are a member of the source channel!")
                 
                 # Check target channel
                 try:
                     target_chat = await app.get_chat(TARGET_CHANNEL)
-                    logger.info(f"✓ Target channel accessible: {target_chat.title} (@{target_chat.username or 'N/A'}) - ID: {target_chat.id}")
+                    logger.info("✓ Target channel accessible: %s (@%s) - ID: %s", target_chat.title, target_chat.username or 'N/A', target_chat.id)
+                    _target_chat_id = target_chat.id
                 except Exception as e:
-                    logger.error(f"✗ Cannot access target channel {TARGET_CHANNEL}: {e}")
+                    logger.error("✗ Cannot access target channel %s: %s", TARGET_CHANNEL, e)
                     logger.error("Make sure you have permission to send messages to the target channel!")
                 
                 logger.info("Channel verification complete. Listening for messages...")
             except Exception as e:
-                logger.warning(f"Error verifying channels: {e}")
+                logger.warning("Error verifying channels: %s", e)
             
-            # Keep the client running using asyncio.Event
-            # This will wait indefinitely until interrupted
-            stop_event = asyncio.Event()
-            await stop_event.wait()
+            # Keep the client running until SIGINT/SIGTERM is received
+            await idle()
+            logger.info("Stopping client...")
+            # Let queued posts go out while the client is still connected
+            try:
+                await asyncio.wait_for(_send_queue.join(), SHUTDOWN_SEND_TIMEOUT)
+            except asyncio.TimeoutError:
+                logger.warning("Posts still queued after %ss, stopping anyway", SHUTDOWN_SEND_TIMEOUT)
+            break
             
         except (ConnectionError, asyncio.TimeoutError, OSError) as e:
             connection_retries += 1
-            logger.error(f"Connection error (attempt {connection_retries}/{max_connection_retries}): {e}")
+            logger.error("Connection error (attempt %s/%s): %s", connection_retries, max_connection_retries, e)
             if connection_retries < max_connection_retries:
                 # Exponential backoff: increase delay with each retry
                 retry_delay = base_retry_delay * (1.5 ** (connection_retries - 1))
-                logger.info(f"Retrying connection in {retry_delay:.1f} seconds...")
+                logger.info("Retrying connection in %.1f seconds...", retry_delay)
                 await asyncio.sleep(retry_delay)
             else:
                 logger.error("Max connection retries reached. Exiting...")
@@ -647,11 +1175,11 @@ async def main() -> None:
                 
                 # Prevent infinite lock retry loops
                 if lock_retry_count > max_lock_retries:
-                    logger.error(f"Max lock retry attempts ({max_lock_retries}) reached. Exiting to prevent infinite loop.")
+                    logger.error("Max lock retry attempts (%s) reached. Exiting to prevent infinite loop.", max_lock_retries)
                     logger.error("Please manually resolve the session lock issue:")
-                    logger.error(f"  1. Stop any other running instances of the bot")
-                    logger.error(f"  2. Delete '{SESSION_NAME}.session' and '{SESSION_NAME}.session-journal' if corrupted")
-                    logger.error(f"  3. Restart the bot (you'll need to re-authenticate)")
+                    logger.error("  1. Stop any other running instances of the bot")
+                    logger.error("  2. Delete '%s.session' and any '-journal', '-wal' and '-shm' files next to it if corrupted", SESSION_NAME)
+                    logger.error("  3. Restart the bot (you'll need to re-authenticate)")
                     break
                 
                 # Ensure client is stopped before attempting unlock
@@ -660,41 +1188,44 @@ async def main() -> None:
                         await app.stop()
                     await asyncio.sleep(2)  # Give time for cleanup and lock release
                 except Exception as stop_error:
-                    logger.debug(f"Error stopping client during lock handling: {stop_error}")
+                    logger.debug("Error stopping client during lock handling: %s", stop_error)
                 
-                is_locked, lock_message = check_session_lock(SESSION_NAME)
-                if is_locked:
-                    logger.error(lock_message)
-                    logger.info("Waiting for session to unlock...")
-                    unlocked = await wait_for_session_unlock(SESSION_NAME, max_wait=10)
-                    if unlocked:
-                        logger.info("Session unlocked! Retrying connection...")
-                        await asyncio.sleep(3)  # Longer pause to ensure lock is fully released
-                        continue
-                    else:
-                        logger.warning("Session is still locked. Attempting to force unlock stale lock...")
-                        force_unlocked = force_unlock_session(SESSION_NAME)
-                        if force_unlocked:
-                            logger.info("Stale lock removed! Retrying connection...")
+                try:
+                    is_locked, lock_message = check_session_lock(SESSION_NAME)
+                    if is_locked:
+                        logger.error(lock_message)
+                        logger.info("Waiting for session to unlock...")
+                        unlocked = await wait_for_session_unlock(SESSION_NAME, max_wait=10)
+                        if unlocked:
+                            logger.info("Session unlocked! Retrying connection...")
                             await asyncio.sleep(3)  # Longer pause to ensure lock is fully released
                             continue
                         else:
-                            logger.error("Session is still locked after force unlock attempt.")
-                            logger.error(f"Lock retry count: {lock_retry_count}/{max_lock_retries}")
-                            # Continue to retry loop instead of breaking immediately
-                            connection_retries += 1
-                else:
-                    logger.warning(f"Database lock error detected but session check shows unlocked. Retrying...")
-                    await asyncio.sleep(3)  # Brief pause before retry
-                    continue
+                            logger.warning("Session is still locked. Attempting to force unlock stale lock...")
+                            force_unlocked = force_unlock_session(SESSION_NAME)
+                            if force_unlocked:
+                                logger.info("Stale lock removed! Retrying connection...")
+                                await asyncio.sleep(3)  # Longer pause to ensure lock is fully released
+                                continue
+                            else:
+                                logger.error("Session is still locked after force unlock attempt.")
+                                logger.error("Lock retry count: %s/%s", lock_retry_count, max_lock_retries)
+                                # Continue to retry loop instead of breaking immediately
+                                connection_retries += 1
+                    else:
+                        logger.warning("Database lock error detected but session check shows unlocked. Retrying...")
+                        await asyncio.sleep(3)  # Brief pause before retry
+                        continue
+                finally:
+                    close_session_probe_conn()
             else:
-                logger.error(f"Unexpected error: {e}", exc_info=True)
+                logger.error("Unexpected error: %s", e, exc_info=True)
                 connection_retries += 1
             
             if connection_retries < max_connection_retries:
                 # Exponential backoff: increase delay with each retry
                 retry_delay = base_retry_delay * (1.5 ** (connection_retries - 1))
-                logger.info(f"Retrying in {retry_delay:.1f} seconds...")
+                logger.info("Retrying in %.1f seconds...", retry_delay)
                 await asyncio.sleep(retry_delay)
             else:
                 logger.error("Max connection retries reached. Exiting...")
@@ -708,14 +1239,46 @@ async def main() -> None:
                     await app.stop()
                 logger.info("Client stopped")
             except Exception as e:
-                logger.error(f"Error stopping client: {e}")
+                logger.error("Error stopping client: %s", e)
+    
+    sender_task.cancel()
+    retry_task.cancel()
+    await asyncio.gather(sender_task, retry_task, return_exceptions=True)
+    
+    # Record whatever could not be sent so it isn't missing from the backup
+    unsent = []
+    while not _send_queue.empty():
+        unsent.append(_send_queue.get_nowait()[1])
+    while not _retry_queue.empty():
+        unsent.extend(_retry_queue.get_nowait()[2])
+    if unsent:
+        logger.error("%s post(s) were not sent before shutdown", len(unsent))
+        _record_unsent(unsent)
+    
+    if writer_task is not None:
+        # Let the writer save whatever is still queued before exiting
+        _backup_queue.put_nowait(None)
+        await writer_task
 
 
 if __name__ == "__main__":
+    # Use uvloop's faster event loop when it's installed (not available on Windows).
+    # uvloop.run creates the loop directly; event loop policies are deprecated in 3.14
+    try:
+        import uvloop
+    except ImportError:
+        uvloop = None
+    
     try:
-        asyncio.run(main())
+        # uvloop.run only exists in uvloop 0.18+; older versions use plain asyncio
+        run = getattr(uvloop, "run", None) if uvloop is not None else None
+        if run is not None:
+            logger.info("Using uvloop event loop")
+            run(main())
+        else:
+            asyncio.run(main())
     except KeyboardInterrupt:
         logger.info("Client stopped by user")
     except Exception as e:
-        logger.error(f"Fatal error: {e}", exc_info=True)
+        logger.error("Fatal error: %s", e, exc_info=True)
         sys.exit(1)
@@ -1,48 +1,99 @@
 """
 Quick script to check if .env configuration is correct
 """
+import argparse
 import os
 import sys
 from dotenv import load_dotenv
 
-# Fix encoding for Windows console
-if sys.platform == 'win32':
-    import codecs
-    sys.stdout = codecs.getwriter('utf-8')(sys.stdout.buffer, 'strict')
-    sys.stderr = codecs.getwriter('utf-8')(sys.stderr.buffer, 'strict')
+# Fixed parts of the report
+BANNER = "=" * 50
+HEADER = f"{BANNER}\nChecking Configuration...\n{BANNER}"
+FOOTER = (
+    f"\n{BANNER}\n"
+    "Expected values:\n"
+    "  SOURCE_CHANNEL=@Hareta_Dollar_Bloe\n"
+    "  TARGET_CHANNEL=@MAMMAD_NEW\n"
+    f"{BANNER}"
+)
+# Status labels indexed by whether a setting is present
+PRESENCE = ("[X] Missing", "[OK] Set")
 
-load_dotenv()
 
-print("=" * 50)
-print("Checking Configuration...")
-print("=" * 50)
+def fix_console_encoding():
+    """Switch the Windows console streams to UTF-8 if they aren't already."""
+    if sys.platform != 'win32' or sys.flags.utf8_mode:
+        return
+    for stream in (sys.stdout, sys.stderr):
+        try:
+            # Reconfigure in place rather than wrapping in a codecs writer
+            if (stream.encoding or '').lower() not in ('utf-8', 'utf8', 'cp65001'):
+                stream.reconfigure(encoding='utf-8')
+        except (AttributeError, LookupError, ValueError):
+            pass
 
-API_ID = os.getenv("API_ID")
-API_HASH = os.getenv("API_HASH")
-SOURCE_CHANNEL = os.getenv("SOURCE_CHANNEL")
-TARGET_CHANNEL = os.getenv("TARGET_CHANNEL")
 
-print(f"\nAPI_ID: {'[OK] Set' if API_ID else '[X] Missing'}")
-print(f"API_HASH: {'[OK] Set' if API_HASH else '[X] Missing'}")
-print(f"\nSOURCE_CHANNEL: {SOURCE_CHANNEL or '[X] Missing'}")
-print(f"TARGET_CHANNEL: {TARGET_CHANNEL or '[X] Missing'}")
-
-if SOURCE_CHANNEL:
-    if not SOURCE_CHANNEL.startswith('@'):
-        print(f"\n[WARNING] SOURCE_CHANNEL should start with @ (e.g., @Hareta_Dollar_Bloe)")
-        print(f"   Current value: {SOURCE_CHANNEL}")
+def check_channel_format(out, name, value, example):
+    """Add whether a channel setting uses the @username form to the report."""
+    if not value.startswith('@'):
+        out.append(f"\n[WARNING] {name} should start with @ (e.g., {example})")
+        out.append(f"   Current value: {value}")
     else:
-        print(f"[OK] SOURCE_CHANNEL format looks correct")
+        out.append(f"[OK] {name} format looks correct")
 
-if TARGET_CHANNEL:
-    if not TARGET_CHANNEL.startswith('@'):
-        print(f"\n[WARNING] TARGET_CHANNEL should start with @ (e.g., @MAMMAD_NEW)")
-        print(f"   Current value: {TARGET_CHANNEL}")
-    else:
-        print(f"[OK] TARGET_CHANNEL format looks correct")
 
-print("\n" + "=" * 50)
-print("Expected values:")
-print(f"  SOURCE_CHANNEL=@Hareta_Dollar_Bloe")
-print(f"  TARGET_CHANNEL=@MAMMAD_NEW")
-print("=" * 50)
+def check(quiet: bool = False) -> int:
+    """
+    Print a report of the .env configuration.
+
+    Args:
+        quiet: Skip the report and only compute the result
+
+    Returns:
+        0 if every required setting is present, 1 otherwise
+    """
+    load_dotenv()
+
+    # Read every setting from the environment once
+    cfg = {k: os.environ.get(k) for k in ("API_ID", "API_HASH", "SOURCE_CHANNEL", "TARGET_CHANNEL")}
+    api_id = cfg["API_ID"]
+    api_hash = cfg["API_HASH"]
+    source_channel = cfg["SOURCE_CHANNEL"]
+    target_channel = cfg["TARGET_CHANNEL"]
+    ok = all(cfg.values())
+
+    if quiet:
+        return 0 if ok else 1
+
+    # The report is collected here and written to stdout in one go at the end
+    out = [HEADER]
+
+    out.append(f"\nAPI_ID: {PRESENCE[bool(api_id)]}")
+    out.append(f"API_HASH: {PRESENCE[bool(api_hash)]}")
+    out.append(f"\nSOURCE_CHANNEL: {source_channel or PRESENCE[0]}")
+    out.append(f"TARGET_CHANNEL: {target_channel or PRESENCE[0]}")
+
+    if source_channel:
+        check_channel_format(out, "SOURCE_CHANNEL", source_channel, "@Hareta_Dollar_Bloe")
+
+    if target_channel:
+        check_channel_format(out, "TARGET_CHANNEL", target_channel, "@MAMMAD_NEW")
+
+    out.append(FOOTER)
+
+    sys.stdout.write("\n".join(out) + "\n")
+
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument(
+        "--quiet",
+        action="store_true",
+        help="print nothing, only exit with 1 if a required setting is missing"
+    )
+    args = parser.parse_args()
+
+    fix_console_encoding()
+    raise SystemExit(check(args.quiet))
@@ -1,22 +1,14 @@
 """
 Test script to check if we can send messages to TARGET_CHANNEL
 """
+import argparse
 import asyncio
+import json
 import os
 import sys
-
-# Fix encoding for Windows console
-if sys.platform == 'win32':
-    try:
-        import codecs
-        if hasattr(sys.stdout, 'buffer') and hasattr(sys.stdout, 'encoding'):
-            if sys.stdout.encoding and sys.stdout.encoding.lower() != 'utf-8':
-                sys.stdout = codecs.getwriter('utf-8')(sys.stdout.buffer, 'strict')
-        if hasattr(sys.stderr, 'buffer') and hasattr(sys.stderr, 'encoding'):
-            if sys.stderr.encoding and sys.stderr.encoding.lower() != 'utf-8':
-                sys.stderr = codecs.getwriter('utf-8')(sys.stderr.buffer, 'strict')
-    except (AttributeError, LookupError, ValueError):
-        pass
+import traceback
+from pathlib import Path
+from types import SimpleNamespace
 
 from dotenv import load_dotenv
 
@@ -27,30 +19,114 @@ API_HASH = os.getenv("API_HASH")
 SESSION_NAME = os.getenv("SESSION_NAME", "bot_session")
 TARGET_CHANNEL = os.getenv("TARGET_CHANNEL")
 
-if not API_ID or not API_HASH or not TARGET_CHANNEL:
-    print("Error: Missing required environment variables!")
-    print("Make sure API_ID, API_HASH, and TARGET_CHANNEL are set in .env file")
-    sys.exit(1)
-
-try:
-    API_ID = int(API_ID)
-except ValueError:
-    print("Error: API_ID must be a valid integer")
-    sys.exit(1)
-
 # Normalize channel identifier
 def normalize_channel(channel: str):
     channel = channel.strip()
     if channel.startswith('@'):
         return channel
-    try:
+    # Numeric IDs (channel IDs are negative) become ints, anything else is a username
+    digits = channel[1:] if channel.startswith('-') else channel
+    if digits.isdecimal():
         return int(channel)
+    return f"@{channel}"
+
+
+def fix_console_encoding() -> None:
+    """Switch the Windows console streams to UTF-8 (the test output uses emoji)."""
+    if sys.platform != 'win32':
+        return
+    for stream in (sys.stdout, sys.stderr):
+        try:
+            stream.reconfigure(encoding='utf-8')
+        except (AttributeError, LookupError, ValueError):
+            # Stream was replaced or doesn't support reconfigure
+            pass
+
+
+def validate_config() -> None:
+    """Check the .env settings and exit with an error message if they're invalid."""
+    global API_ID, TARGET_CHANNEL
+    
+    if not API_ID or not API_HASH or not TARGET_CHANNEL:
+        print("Error: Missing required environment variables!")
+        print("Make sure API_ID, API_HASH, and TARGET_CHANNEL are set in .env file")
+        sys.exit(1)
+    
+    try:
+        API_ID = int(API_ID)
     except ValueError:
-        return f"@{channel}" if not channel.startswith('@') else channel
+        print("Error: API_ID must be a valid integer")
+        sys.exit(1)
+    
+    TARGET_CHANNEL = normalize_channel(TARGET_CHANNEL)
+
+TEST_MESSAGE = "🧪 Test message from bot - If you see this, the bot can send messages!"
+
+# get_me() result for the logged-in account, cached between runs
+ME_CACHE_FILE = Path(f".{SESSION_NAME}.me.json")
+
+
+async def get_me_cached(app, refresh: bool = False):
+    """
+    Return the logged-in user, reading it from ME_CACHE_FILE when possible.
+    
+    The cache is only used if it belongs to the account stored in the session
+    file (a local read), so logging in with another account refetches it.
+    
+    Args:
+        app: The started Pyrogram client
+        refresh: Ignore the cache and ask Telegram again
+    """
+    if not refresh:
+        try:
+            cached = SimpleNamespace(**json.loads(ME_CACHE_FILE.read_text(encoding='utf-8')))
+        except (OSError, ValueError, TypeError):
+            cached = None
+        if cached is not None and getattr(cached, 'id', None) == await app.storage.user_id():
+            return cached
+    
+    me = await app.get_me()
+    try:
+        ME_CACHE_FILE.write_text(
+            json.dumps({"id": me.id, "first_name": me.first_name, "username": me.username}),
+            encoding='utf-8'
+        )
+    except OSError:
+        pass
+    return me
+
 
-TARGET_CHANNEL = normalize_channel(TARGET_CHANNEL)
+# Member status checks. Each prints its findings and returns False if the
+# remaining tests should be skipped
+def on_restricted(member) -> bool:
+    print("     [WARNING] Your account is restricted in this channel")
+    perms = getattr(member, 'permissions', None)
+    print(f"     Can send messages: {getattr(perms, 'can_send_messages', 'Unknown')}")
+    return True
 
-async def test_target_channel():
+
+def on_left(member) -> bool:
+    print("     [ERROR] You are not a member of this channel")
+    print("     Solution: Join the channel first")
+    return False
+
+
+def on_banned(member) -> bool:
+    print("     [ERROR] You are banned from this channel")
+    print("     Solution: Contact channel admin to unban you")
+    return False
+
+
+STATUS_ACTIONS = {
+    "restricted": on_restricted,
+    "left": on_left,
+    "banned": on_banned,
+    # Name used by Pyrogram 1.x
+    "kicked": on_banned,
+}
+
+
+async def test_target_channel(refresh_me: bool = False):
     """Test if we can access and send messages to TARGET_CHANNEL"""
     # Import here to avoid event loop issues
     from pyrogram import Client
@@ -63,132 +139,154 @@ async def test_target_channel():
         RPCError
     )
     
-    app = Client(
-        name=SESSION_NAME,
-        api_id=API_ID,
-        api_hash=API_HASH,
-        workdir=".",
-    )
+    # Known errors of the channel lookup and send tests: (message, solution lines)
+    chat_errors = {
+        ChannelPrivate: ("Channel is private", [
+            "Solution: Join the channel or ask to be added as a member/admin",
+        ]),
+        UsernameNotOccupied: ("Channel username not found", [
+            "Solution: Check the channel username in your .env file",
+        ]),
+        PeerIdInvalid: ("Invalid channel ID/username", [
+            "Solution: Check the channel identifier in your .env file",
+        ]),
+    }
+    send_errors = {
+        ChatWriteForbidden: ("Cannot write to channel", [
+            "This means you don't have permission to send messages.",
+            "Solutions:",
+            "- For public channels: Make sure you joined the channel",
+            "- For private channels: You need to be an admin with 'Post Messages' permission",
+            "- Check if the channel allows members to post",
+        ]),
+        UserBannedInChannel: ("You are banned from this channel", [
+            "Solution: Contact channel admin to unban you",
+        ]),
+        ChannelPrivate: ("Channel is private", [
+            "Solution: Join the channel or ask to be added",
+        ]),
+    }
+    
+    def print_error(errors, e):
+        message, solution = errors[type(e)]
+        print(f"[ERROR] {message}: {e}")
+        for line in solution:
+            print(f"        {line}")
     
     try:
-        await app.start()
-        print("=" * 60)
-        print("Testing TARGET_CHANNEL Access")
-        print("=" * 60)
-        
-        me = await app.get_me()
-        print(f"\nLogged in as: {me.first_name} (@{me.username or 'N/A'})")
-        print(f"Target Channel: {TARGET_CHANNEL}\n")
-        
-        # Test 1: Check if channel exists and is accessible
-        print("Test 1: Checking channel access...")
-        try:
-            target_chat = await app.get_chat(TARGET_CHANNEL)
-            print(f"[OK] Channel found: {target_chat.title}")
-            print(f"     Channel ID: {target_chat.id}")
-            print(f"     Username: @{target_chat.username or 'N/A'}")
-            print(f"     Type: {target_chat.type}")
-        except ChannelPrivate as e:
-            print(f"[ERROR] Channel is private: {e}")
-            print("        Solution: Join the channel or ask to be added as a member/admin")
-            return
-        except UsernameNotOccupied as e:
-            print(f"[ERROR] Channel username not found: {e}")
-            print("        Solution: Check the channel username in your .env file")
-            return
-        except PeerIdInvalid as e:
-            print(f"[ERROR] Invalid channel ID/username: {e}")
-            print("        Solution: Check the channel identifier in your .env file")
-            return
-        except Exception as e:
-            print(f"[ERROR] Cannot access channel: {e}")
-            return
-        
-        # Test 2: Check member status
-        print("\nTest 2: Checking member status...")
-        try:
-            member = await app.get_chat_member(TARGET_CHANNEL, me.id)
-            print(f"[OK] Member status: {member.status}")
-            if member.status == "restricted":
-                print("     [WARNING] Your account is restricted in this channel")
-                if hasattr(member, 'permissions'):
-                    perms = member.permissions
-                    print(f"     Can send messages: {perms.can_send_messages if hasattr(perms, 'can_send_messages') else 'Unknown'}")
-            elif member.status == "left":
-                print("     [ERROR] You are not a member of this channel")
-                print("     Solution: Join the channel first")
+        # The client is started on entry and stopped on exit, even on errors
+        async with Client(
+            name=SESSION_NAME,
+            api_id=API_ID,
+            api_hash=API_HASH,
+            workdir=".",
+        ) as app:
+            print("=" * 60)
+            print("Testing TARGET_CHANNEL Access")
+            print("=" * 60)
+            
+            me = await get_me_cached(app, refresh_me)
+            print(f"\nLogged in as: {me.first_name} (@{me.username or 'N/A'})")
+            print(f"Target Channel: {TARGET_CHANNEL}\n")
+            
+            # Tests 1 and 2 don't depend on each other, so both requests are sent at once
+            target_chat, member = await asyncio.gather(
+                app.get_chat(TARGET_CHANNEL),
+                app.get_chat_member(TARGET_CHANNEL, me.id),
+                return_exceptions=True
+            )
+            
+            # Test 1: Check if channel exists and is accessible
+            print("Test 1: Checking channel access...")
+            try:
+                if isinstance(target_chat, Exception):
+                    raise target_chat
+                print(
+                    f"[OK] Channel found: {target_chat.title}\n"
+                    f"     Channel ID: {target_chat.id}\n"
+                    f"     Username: @{target_chat.username or 'N/A'}\n"
+                    f"     Type: {target_chat.type}"
+                )
+            except tuple(chat_errors) as e:
+                print_error(chat_errors, e)
                 return
-            elif member.status == "kicked":
-                print("     [ERROR] You are banned from this channel")
-                print("     Solution: Contact channel admin to unban you")
+            except Exception as e:
+                print(f"[ERROR] Cannot access channel: {e}")
                 return
-        except Exception as e:
-            print(f"[WARNING] Could not check member status: {e}")
-        
-        # Test 3: Try to send a test message
-        print("\nTest 3: Testing message send capability...")
-        test_message = "🧪 Test message from bot - If you see this, the bot can send messages!"
-        try:
-            sent_msg = await app.send_message(
-                chat_id=TARGET_CHANNEL,
-                text=test_message
-            )
-            print(f"[OK] Test message sent successfully!")
-            print(f"     Message ID: {sent_msg.id}")
-            print(f"     You should see the test message in the channel now.")
-            print(f"\n     [NOTE] You can delete this test message from the channel.")
-        except ChatWriteForbidden as e:
-            print(f"[ERROR] Cannot write to channel: ChatWriteForbidden")
-            print("        This means you don't have permission to send messages.")
-            print("        Solutions:")
-            print("        - For public channels: Make sure you joined the channel")
-            print("        - For private channels: You need to be an admin with 'Post Messages' permission")
-            print("        - Check if the channel allows members to post")
-            return
-        except UserBannedInChannel as e:
-            print(f"[ERROR] You are banned from this channel: {e}")
-            print("        Solution: Contact channel admin to unban you")
-            return
-        except ChannelPrivate as e:
-            print(f"[ERROR] Channel is private: {e}")
-            print("        Solution: Join the channel or ask to be added")
-            return
-        except RPCError as e:
-            print(f"[ERROR] Telegram RPC error: {e}")
-            print(f"        Error code: {e.ID if hasattr(e, 'ID') else 'Unknown'}")
-            return
-        except Exception as e:
-            print(f"[ERROR] Unexpected error: {type(e).__name__}: {e}")
-            return
-        
-        print("\n" + "=" * 60)
-        print("[SUCCESS] All tests passed! The bot should be able to send messages.")
-        print("=" * 60)
-        
+            
+            # Test 2: Check member status
+            print("\nTest 2: Checking member status...")
+            try:
+                if isinstance(member, Exception):
+                    raise member
+                print(f"[OK] Member status: {member.status}")
+                # Pyrogram 2 reports a ChatMemberStatus enum; match on its string value
+                action = STATUS_ACTIONS.get(getattr(member.status, "value", member.status))
+                if action is not None and not action(member):
+                    return
+            except Exception as e:
+                print(f"[WARNING] Could not check member status: {e}")
+            
+            # Test 3: Try to send a test message
+            print("\nTest 3: Testing message send capability...")
+            try:
+                sent_msg = await app.send_message(
+                    chat_id=TARGET_CHANNEL,
+                    text=TEST_MESSAGE
+                )
+                print(f"[OK] Test message sent successfully!")
+                print(f"     Message ID: {sent_msg.id}")
+                print(f"     You should see the test message in the channel now.")
+                print(f"\n     [NOTE] You can delete this test message from the channel.")
+            except tuple(send_errors) as e:
+                print_error(send_errors, e)
+                return
+            except RPCError as e:
+                print(f"[ERROR] Telegram RPC error: {e}")
+                print(f"        Error code: {getattr(e, 'ID', 'Unknown')}")
+                return
+            except Exception as e:
+                print(f"[ERROR] Unexpected error: {type(e).__name__}: {e}")
+                return
+            
+            print("\n" + "=" * 60)
+            print("[SUCCESS] All tests passed! The bot should be able to send messages.")
+            print("=" * 60)
+            
     except Exception as e:
         print(f"\n[FATAL ERROR] {type(e).__name__}: {e}")
-        import traceback
         traceback.print_exc()
-    finally:
-        try:
-            if app.is_connected:
-                await app.stop()
-        except:
-            pass
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument(
+        "--refresh-me",
+        action="store_true",
+        help=f"ignore the cached account info in {ME_CACHE_FILE} and fetch it again"
+    )
+    parser.add_argument(
+        "--validate-only",
+        action="store_true",
+        help="only check the .env settings, without connecting to Telegram"
+    )
+    args = parser.parse_args()
+    
+    # Exit early on incomplete settings, before connecting
+    validate_config()
+    
+    if args.validate_only:
+        print(f"Configuration OK - Target Channel: {TARGET_CHANNEL}")
+        sys.exit(0)
+    
+    # Only set up the console once the settings are known to be usable
+    fix_console_encoding()
+    
     try:
-        # Fix for Python 3.14+ event loop handling
-        try:
-            loop = asyncio.get_event_loop()
-        except RuntimeError:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-        
-        loop.run_until_complete(test_target_channel())
+        # Pyrogram is imported inside test_target_channel, so the loop created
+        # by asyncio.run already exists when it looks for one (Python 3.14+)
+        asyncio.run(test_target_channel(args.refresh_me))
     except KeyboardInterrupt:
         print("\n\nTest interrupted by user")
     except Exception as e:
         print(f"\n[FATAL ERROR] {e}")
-        import traceback
         traceback.print_exc()